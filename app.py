@@ -1,15 +1,62 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, g
+from flask_sock import Sock
+import gemini_suggester
 from gemini_suggester import suggest_with_gemini
 from config import get_classification_from_keywords
+from language import detect_language
 from recommendations import generate_recommendations
+from keyword_matcher import IncrementalClassifier
+from chat_stream import ChatStream, MAX_MESSAGE_SIZE
+from lexicon import get_lexicon
+import rewrite_cache
+import profiling
+from collections import OrderedDict
 import os
+import threading
+import uuid
 
 app = Flask(__name__)
+# Frames are parsed whole, so their size is capped before anything reads them.
+app.config['SOCK_SERVER_OPTIONS'] = {'max_message_size': MAX_MESSAGE_SIZE}
+sock = Sock(app)
 
 # Ensure template changes are picked up without restarting (dev use)
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 
+# Build (or map) the keyword lexicon now, so a server that forks after importing
+# the app (e.g. `gunicorn --preload`) shares one copy between its workers.
+get_lexicon()
+rewrite_cache.load()
+
+# Load the Gemini SDK off the request path. Until it is ready, /predict serves
+# keyword classification with the local rules-based recommendations.
+gemini_suggester.preload()
+
+# Matcher state for live typing, keyed by a client token. Oldest sessions are evicted first.
+MAX_LIVE_SESSIONS = int(os.environ.get("MAX_LIVE_SESSIONS", 1000))
+# Longest text (in characters) a live session may hold; its matcher state grows with the text.
+MAX_LIVE_TEXT_LENGTH = int(os.environ.get("MAX_LIVE_TEXT_LENGTH", 5000))
+# Characters held across all sessions (about 26 bytes of matcher state each).
+MAX_LIVE_TOTAL_CHARS = int(os.environ.get("MAX_LIVE_TOTAL_CHARS", 500_000))
+_live_sessions = OrderedDict()
+_live_chars = 0
+_live_sessions_lock = threading.Lock()
+
+# Opt-in profiling (see profiling.py). The hooks are only registered when PROFILE_MODE is set.
+if profiling.ENABLED:
+    @app.before_request
+    def start_profile():
+        # A WebSocket would be sampled for the whole life of the connection.
+        if request.endpoint != "stream" and profiling.should_profile(request.headers.get("X-Profile")):
+            g.profile = profiling.ProfileSession(request.endpoint or "unknown").start()
+
+    @app.teardown_request
+    def stop_profile(exc):
+        session = g.pop("profile", None)
+        if session is not None:
+            session.stop()
+
 @app.after_request
 def add_no_cache_headers(response):
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
@@ -21,6 +68,30 @@ def add_no_cache_headers(response):
 def home():
     return render_template("index.html")
 
+def get_recommendations(text: str, context: str, result: dict) -> dict:
+    """Returns {suggestions, polite_rewrite} for a comment classified by get_classification_from_keywords."""
+    # --- Recommendation Logic: Precomputed rewrites, then Gemini, then local rules ---
+    # 0. Frequent toxic phrases have precomputed rewrites (see build_rewrite_cache.py).
+    cached = rewrite_cache.lookup(text, context)
+    if cached is not None:
+        return cached
+
+    # 1. Attempt to get high-quality suggestions from Gemini first (once the SDK has loaded).
+    if gemini_suggester.is_ready():
+        gem = suggest_with_gemini(text, context, result.get("language"))
+    else:
+        gem = {}
+    
+    # 2. If Gemini fails or returns no content, use the local rules-based fallback.
+    if gem.get("gemini_tips") or gem.get("gemini_rewrite"):
+        print("✨ Using suggestions from Gemini API.")
+        # Use Gemini's output for the main recommendation fields.
+        return {"suggestions": gem.get("gemini_tips", []), "polite_rewrite": gem.get("gemini_rewrite", "")}
+
+    print("⚠️ Gemini failed or returned no content. Using local rules-based fallback.")
+    # Fallback to the local, rules-based generator.
+    return generate_recommendations(text, result)
+
 @app.route("/predict", methods=["POST"])
 def predict():
     data = request.get_json()
@@ -28,28 +99,75 @@ def predict():
         return jsonify({"error": "Text input is missing"}), 400
 
     print(f"🔍 Received text: '{data['text']}' with context: '{data.get('context', 'None')}'")
+    # Detect the language once; the classifier and the suggester both use it (via result["language"]).
+    language = detect_language(data["text"])
     # Using keyword-based classification since local models are disabled
-    result = get_classification_from_keywords(data["text"], data.get("context"))
-    
-    # --- Recommendation Logic: Prioritize Gemini, fall back to local rules ---
-    # 1. Attempt to get high-quality suggestions from Gemini first.
-    gem = suggest_with_gemini(data["text"], data.get("context"))
-    
-    # 2. If Gemini fails or returns no content, use the local rules-based fallback.
-    if gem.get("gemini_tips") or gem.get("gemini_rewrite"):
-        print("✨ Using suggestions from Gemini API.")
-        # Use Gemini's output for the main recommendation fields.
-        result["suggestions"] = gem.get("gemini_tips", [])
-        result["polite_rewrite"] = gem.get("gemini_rewrite", "")
-    else:
-        print("⚠️ Gemini failed or returned no content. Using local rules-based fallback.")
-        # Fallback to the local, rules-based generator.
-        rec = generate_recommendations(data["text"], result)
-        result.update(rec)
+    result = get_classification_from_keywords(data["text"], data.get("context"), language)
+    result.update(get_recommendations(data["text"], data.get("context"), result))
         
     print("✅ Sending result:", result)
     return jsonify(result)
 
+@app.route("/predict/incremental", methods=["POST"])
+def predict_incremental():
+    """
+    Keyword classification for live typing. The client sends only the edit:
+    `keep` characters of the previously sent text are kept and `append` is added
+    after them. Responds with 409 and `resync: true` when the session is unknown
+    (e.g. evicted) so the client can resend the full text with keep=0.
+    """
+    global _live_chars
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "'keep' (int) and 'append' (str) are required"}), 400
+    keep, append = data.get("keep"), data.get("append", "")
+    if not isinstance(keep, int) or isinstance(keep, bool) or keep < 0 or not isinstance(append, str):
+        return jsonify({"error": "'keep' (int >= 0) and 'append' (str) are required"}), 400
+    if not isinstance(data.get("token"), (str, type(None))) or not isinstance(data.get("context"), (str, type(None))):
+        return jsonify({"error": "'token' and 'context' must be strings"}), 400
+    if keep + len(append) > MAX_LIVE_TEXT_LENGTH:
+        return jsonify({"error": f"Text is longer than {MAX_LIVE_TEXT_LENGTH} characters"}), 413
+
+    token = data.get("token")
+    # Updates only cost as much as the edit, so a single lock around the session table is enough.
+    with _live_sessions_lock:
+        session = _live_sessions.get(token) if token else None
+        if session is not None:
+            _live_sessions.move_to_end(token)
+        elif keep == 0:
+            token = uuid.uuid4().hex
+            session = _live_sessions[token] = IncrementalClassifier()
+        else:
+            return jsonify({"error": "Unknown session", "resync": True}), 409
+
+        session.set_context(data.get("context"))
+        _live_chars -= len(session)
+        try:
+            result = session.update(keep, append)
+        except ValueError as e:
+            return jsonify({"error": str(e), "resync": True}), 409
+        finally:
+            _live_chars += len(session)
+        result["length"] = len(session)
+
+        # Evict the least recently used sessions (never the current one) until both limits hold.
+        while len(_live_sessions) > 1 and (
+            len(_live_sessions) > MAX_LIVE_SESSIONS or _live_chars > MAX_LIVE_TOTAL_CHARS
+        ):
+            _, evicted = _live_sessions.popitem(last=False)
+            _live_chars -= len(evicted)
+
+    result["token"] = token
+    return jsonify(result)
+
+@sock.route("/stream")
+def stream(ws):
+    """
+    Persistent connection for chat moderation: verdicts are pushed back per message,
+    rewrites follow as they complete. See chat_stream.py for the message format.
+    """
+    ChatStream(ws, get_recommendations).run()
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))  # Render uses dynamic port
     app.run(debug=False, host='0.0.0.0', port=port)
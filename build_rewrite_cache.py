@@ -0,0 +1,81 @@
+import argparse
+import time
+from collections import Counter
+
+import rewrite_cache
+from config import get_classification_from_keywords
+from lexicon import get_lexicon, ANY_TOXIC
+import gemini_suggester
+from gemini_suggester import suggest_with_gemini
+
+
+def phrases_from_log(path, top_n):
+    """Returns the `top_n` most frequent comments in a log with one comment per line."""
+    with open(path, encoding="utf-8") as f:
+        counts = Counter(rewrite_cache.normalize(line) for line in f if line.strip())
+    return [phrase for phrase, _ in counts.most_common(top_n)]
+
+
+def phrases_from_lexicon(top_n):
+    """Returns up to `top_n` toxic keywords from the lexicon, shortest (most generic) first."""
+    words = sorted(get_lexicon().words(ANY_TOXIC), key=lambda word: (len(word), word))
+    return [rewrite_cache.normalize(word) for word in words[:top_n]]
+
+
+def build_cache(phrases, delay=0.0):
+    """
+    Asks Gemini for a rewrite of each toxic phrase.
+
+    Only Gemini rewrites are stored: cached entries are served instead of Gemini,
+    and the local rules are cheap enough to run live. Phrases Gemini fails on are
+    left out so /predict keeps trying Gemini for them.
+
+    Args:
+        phrases (list[str]): Normalized comments to precompute.
+        delay (float): Seconds to wait between Gemini calls, to stay under rate limits.
+    """
+    entries = {}
+    skipped = 0
+    for phrase in phrases:
+        result = get_classification_from_keywords(phrase)
+        if result["label"] != "toxic":
+            continue
+
+        gem = suggest_with_gemini(phrase, None, result["language"])
+        if gem.get("gemini_tips") or gem.get("gemini_rewrite"):
+            entries[phrase] = {"suggestions": gem.get("gemini_tips", []), "polite_rewrite": gem.get("gemini_rewrite", "")}
+        else:
+            skipped += 1
+        time.sleep(delay)
+    return entries, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute rewrites for the most frequent toxic comments.")
+    parser.add_argument("--log", help="File with one logged comment per line. Defaults to the lexicon keywords.")
+    parser.add_argument("--top", type=int, default=1000, help="Number of phrases to precompute (default: 1000).")
+    parser.add_argument("--delay", type=float, default=1.0, help="Seconds between Gemini calls (default: 1.0).")
+    parser.add_argument("--output", default=rewrite_cache.DEFAULT_PATH, help="Where to write the table.")
+    args = parser.parse_args()
+
+    print("🗂️  Building the rewrite cache...")
+    gemini_suggester.preload().join()
+    if not gemini_suggester.is_ready():
+        print("❌ Gemini is not configured. Set GEMINI_API_KEY.")
+        return
+    if args.log:
+        phrases = phrases_from_log(args.log, args.top)
+        print(f"  - Using the {len(phrases)} most frequent comments from '{args.log}'")
+    else:
+        phrases = phrases_from_lexicon(args.top)
+        print(f"  - Using {len(phrases)} keywords from the lexicon")
+
+    entries, skipped = build_cache(phrases, delay=args.delay)
+    rewrite_cache.save(entries, args.output)
+    print(f"✅ Saved {len(entries)} rewrites to '{args.output}'")
+    if skipped:
+        print(f"⚠️  {skipped} phrases got no Gemini rewrite and were left out.")
+
+
+if __name__ == "__main__":
+    main()
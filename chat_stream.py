@@ -0,0 +1,144 @@
+# chat_stream.py
+
+"""
+Message handling for the /stream WebSocket used by chat integrations.
+
+Every message gets a keyword verdict straight away. Rewrites for toxic messages
+are queued and sent later, as they complete. The queue is bounded: when the
+suggester falls behind, the connection stops reading new messages until a slot
+frees up, so a fast sender is slowed down instead of growing the backlog.
+
+Client -> server (one JSON object, or a JSON list of them, per frame):
+    {"id": ..., "text": str, "thread": str | int, "context": str, "rewrite": bool}
+Server -> client:
+    {"type": "verdict", "id": ..., <classification fields>}
+    {"type": "rewrite", "id": ..., "suggestions": [...], "polite_rewrite": str}
+    {"type": "backpressure", "pending": int}
+    {"type": "error", "id": ..., "error": str}
+"""
+
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+import rewrite_cache
+from config import get_classification_from_keywords
+
+# Rewrites waiting for the suggester, per connection.
+MAX_PENDING_REWRITES = int(os.environ.get("STREAM_MAX_PENDING_REWRITES", 32))
+# Threads whose last message is remembered as context, per connection.
+MAX_THREADS = int(os.environ.get("STREAM_MAX_THREADS", 1000))
+# Largest frame (in bytes) the socket accepts; larger ones close the connection.
+MAX_MESSAGE_SIZE = int(os.environ.get("STREAM_MAX_MESSAGE_SIZE", 64 * 1024))
+
+_STOP = object()
+
+
+class ChatStream:
+    """Handles one WebSocket connection."""
+
+    def __init__(self, ws, get_recommendations):
+        """
+        Args:
+            ws: The WebSocket, with `send(str)` and `receive()` methods.
+            get_recommendations (callable): (text, context, result) -> {suggestions, polite_rewrite}.
+        """
+        self.ws = ws
+        self.get_recommendations = get_recommendations
+        self._send_lock = threading.Lock()
+        self._rewrites = queue.Queue(maxsize=MAX_PENDING_REWRITES)
+        self._closed = threading.Event()
+        self._last_message = OrderedDict()  # thread -> last message text
+
+    def send(self, payload: dict):
+        # The reader and the rewrite worker both send, so writes are serialized.
+        with self._send_lock:
+            self.ws.send(json.dumps(payload))
+
+    def run(self):
+        """Reads messages until the client disconnects."""
+        worker = threading.Thread(target=self._rewrite_worker, name="stream-rewriter", daemon=True)
+        worker.start()
+        try:
+            while True:
+                raw = self.ws.receive()
+                if raw is None:
+                    break
+                try:
+                    messages = json.loads(raw)
+                except ValueError:
+                    self.send({"type": "error", "id": None, "error": "Invalid JSON"})
+                    continue
+                for message in messages if isinstance(messages, list) else [messages]:
+                    self.handle_message(message)
+        finally:
+            self._closed.set()
+            self._rewrites.put(_STOP)
+            worker.join()
+
+    def _context_for(self, message: dict) -> str | None:
+        """Explicit context wins; otherwise the previous message in the same thread is used."""
+        thread = message.get("thread")
+        context = message.get("context")
+        if thread is None:
+            return context
+        if context is None:
+            context = self._last_message.get(thread)
+        self._last_message[thread] = message["text"]
+        self._last_message.move_to_end(thread)
+        while len(self._last_message) > MAX_THREADS:
+            self._last_message.popitem(last=False)
+        return context
+
+    def handle_message(self, message):
+        if not isinstance(message, dict) or not isinstance(message.get("text"), str):
+            message_id = message.get("id") if isinstance(message, dict) else None
+            self.send({"type": "error", "id": message_id, "error": "Text input is missing"})
+            return
+        if not isinstance(message.get("thread"), (str, int, type(None))):
+            self.send({"type": "error", "id": message.get("id"), "error": "'thread' must be a string or number"})
+            return
+        if not isinstance(message.get("context"), (str, type(None))):
+            self.send({"type": "error", "id": message.get("id"), "error": "'context' must be a string"})
+            return
+        if not isinstance(message.get("rewrite", True), bool):
+            self.send({"type": "error", "id": message.get("id"), "error": "'rewrite' must be true or false"})
+            return
+
+        context = self._context_for(message)
+        result = get_classification_from_keywords(message["text"], context)
+        self.send({"type": "verdict", "id": message.get("id"), **result})
+
+        if result["label"] == "toxic" and message.get("rewrite", True):
+            # Precomputed rewrites are sent right away instead of waiting behind the queue.
+            cached = rewrite_cache.lookup(message["text"], context)
+            if cached is not None:
+                self.send({"type": "rewrite", "id": message.get("id"), **cached})
+                return
+            job = (message.get("id"), message["text"], context, result)
+            try:
+                self._rewrites.put_nowait(job)
+            except queue.Full:
+                # Suggester is behind: tell the client, then block (and stop reading) until it catches up.
+                self.send({"type": "backpressure", "pending": self._rewrites.qsize()})
+                self._rewrites.put(job)
+
+    def _rewrite_worker(self):
+        while True:
+            job = self._rewrites.get()
+            if job is _STOP:
+                return
+            if self._closed.is_set():
+                continue  # Client is gone; just drain the queue.
+            message_id, text, context, result = job
+            try:
+                payload = {"type": "rewrite", "id": message_id, **self.get_recommendations(text, context, result)}
+            except Exception as e:
+                print(f"[Stream] ❌ Rewrite failed for message {message_id}: {e}")
+                payload = {"type": "error", "id": message_id, "error": "Rewrite failed"}
+            try:
+                self.send(payload)
+            except Exception:
+                self._closed.set()
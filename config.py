@@ -6,6 +6,10 @@ You can add or remove words from these lists to customize the detector's
 sensitivity and specificity for 'toxic' and 'cyberbullying' comments.
 """
 
+from language import detect_language, language_from_matches
+from profiling import timed
+from lexicon import get_lexicon, SEVERE, CYBERBULLYING, TOXIC, POSITIVE, MIRRORING, ANY_TOXIC
+
 # ==============================================================================
 # CLASSIFICATION HIERARCHY:
 # 1. SEVERE_OVERLAP_WORDS: Checked first. Flags comment as BOTH toxic and cyberbullying.
@@ -61,7 +65,7 @@ CYBERBULLYING_WORDS = {
     "you're a joke", "so triggered", "get a life", "touch grass", "stay mad",
     "grow up", "get over it", "you're so sensitive", "you are a joke", "cope harder",
     "skill issue", "ez", "get good", "gg ez", "owned", "pwned", "rekt",
-    "imagine being you", "ratio", "L", "take the L", "hold this L",
+    "imagine being you", "ratio",
     "who asked", "nobody asked", "did I ask", "and?", "ok and?",
     "are you crying", "u mad bro", "you mad?", "salty", "stay salty",
     "what a child", "such a baby", "you're pathetic",
@@ -130,7 +134,9 @@ POSITIVE_CONTEXT_WORDS = {
     "hell yeah", "damn good", "shit hot", "sick as fuck", "dope as fuck",
 }
 
-# --- Combined Hinglish Keywords for Language Detection ---
+# --- Hinglish Keywords for Language Detection ---
+# The same words are listed in the categories above; in the lexicon they are
+# stored once, tagged with both their category and the HINGLISH flag.
 HINGLISH_KEYWORDS = {
     # Severe
     "madarchod", "bhenchod", "bhen ke lode", "bsdk", "bkl", "chutiye", "gandu",
@@ -141,68 +147,115 @@ HINGLISH_KEYWORDS = {
     "ullu ka pattha", "dimag kharab hai", "nikal", "chal nikal",
     # Toxic
     "bakwaas", "kya bakwaas hai", "abe", "hatt", "chal hatt", "kya musibat hai",
+    # Mirroring
+    "tu bhi", "aap bhi", "tere jaisa", "tere jese",
 }
 
+# --- Common Hinglish words used to detect the language of a comment ---
+# A comment containing any of these (or any word of the Hinglish keywords above)
+# is treated as Hinglish, so its rewrite is asked for in Hinglish. Words that
+# are also common in English ("to", "me") are deliberately left out.
+HINGLISH_MARKER_WORDS = {
+    "hai", "hain", "nahi", "nahin", "nhi", "kya", "kyun", "kyu", "kaise", "kaisa",
+    "tu", "tum", "teri", "tere", "mera", "meri", "apna", "apni",
+    "aap", "aapka", "aapki", "humara", "yaar", "yar", "bhai", "bhi", "toh",
+    "acha", "accha", "achha", "theek", "thik", "bahut", "bohot", "kuch",
+    "abhi", "raha", "rahi", "rahe", "tha", "thi", "hoga", "gaya", "gayi",
+    "karo", "karna", "kar", "bol", "bolo", "dekh", "dekho", "samajh", "chal", "chalo",
+    "mein", "mujhe", "tujhe", "usko", "isko", "wala", "wali", "haan",
+}
 
-def _find_first_match(text: str, word_set: set) -> str | None:
-    """Helper to find the first keyword from a set that exists in the text."""
-    for word in word_set:
-        if word in text:
-            return word
-    return None
-    
-def get_classification_from_keywords(text: str, context: str = None) -> dict:
+# Hinglish words that are also ordinary English words or names ("a mere mistake",
+# "band", MATLAB), and so must not mark a comment as Hinglish on their own.
+ENGLISH_LOOKALIKE_WORDS = {"band", "mere", "tera", "matlab", "sab"}
+
+# --- Replies that throw an insult back ("mirroring") ---
+# On their own these are harmless, but after a toxic parent comment they escalate it.
+MIRRORING_PHRASES = {
+    "so are you", "you too", "right back at you", "just like you", 
+    "takes one to know one", "no you",
+    # Hinglish equivalents
+    "tu bhi", "aap bhi", "tere jaisa", "tere jese",
+}
+
+# --- Direct threats of harm ---
+# Also listed in SEVERE_OVERLAP_WORDS; these additionally tell the rule-based
+# rewriter to replace the whole comment instead of softening it.
+THREAT_PHRASES = {
+    "kill yourself", "kys", "go die", "drink bleach", "hang yourself",
+    "i will kill you", "i'll kill you", "i will find you", "i'll find you",
+    "i will beat you", "i'll beat you", "i will hurt you", "i'll hurt you",
+    "you're dead", "i hope you die",
+}
+
+# --- Softer replacements used by the rule-based rewriter ---
+INSULT_REPLACEMENTS = {
+    "idiot": "person", "moron": "person", "stupid": "unhelpful",
+    "dumb": "unclear", "retard": "person", "loser": "person",
+    "ugly": "not nice", "fat": "overweight", "worthless": "not helpful",
+}
+
+
+# ==============================================================================
+# All of the lists above are compiled into one deduplicated store (lexicon.py),
+# and matching reads from that store only.
+# ==============================================================================
+
+@timed("config._find_first_match")
+def _find_first_match(lexicon, matches: dict, flag: int) -> str | None:
+    """Helper to find the first matched keyword (lowest word id) in the given category."""
+    word_ids = [word_id for word_id in matches if lexicon.word_flags(word_id) & flag]
+    return lexicon.word(min(word_ids)) if word_ids else None
+
+
+def _context_is_toxic(lowered_context: str) -> bool:
+    """True if the parent comment contains ANY form of toxicity."""
+    lexicon = get_lexicon()
+    return any(lexicon.word_flags(word_id) & ANY_TOXIC for word_id in lexicon.scan(lowered_context))
+
+
+def _resolve_classification(lowered_text: str | None, matches: dict, context_is_toxic, lexicon) -> dict:
     """
-    Classifies text based on keyword matching.
-    Follows a more nuanced hierarchy to improve accuracy.
+    Applies the classification hierarchy to the keywords found in a text.
+
+    Args:
+        lowered_text (str | None): The lowered, stripped text, used for exact matches.
+                                   None if the text is too long to be an exact match.
+        matches (dict): {word id: occurrences} of the `lexicon` keywords found in the text.
+        context_is_toxic (callable): Returns whether the parent comment is toxic. Only
+                                     called when the text mirrors an insult.
+        lexicon (Lexicon): The store the matches come from.
     """
-    lowered_text = text.lower().strip()
-    lowered_context = context.lower().strip() if context else ""
+    exact_flags = lexicon.flags(lowered_text) if lowered_text is not None else 0
 
-    # --- New Contextual Logic: Check for "mirroring" insults ---
-    MIRRORING_PHRASES = {
-        "so are you", "you too", "right back at you", "just like you", 
-        "takes one to know one", "no you",
-        # Hinglish equivalents
-        "tu bhi", "aap bhi", "tere jaisa", "tere jese",
-    }
-    # Check for exact phrases or phrases that imply "like you"
-    is_mirroring = any(phrase in lowered_text for phrase in MIRRORING_PHRASES)
-
-    if is_mirroring:
-        if lowered_context:
-            # If the context contained ANY form of toxicity, a mirroring reply escalates it to a personal attack.
-            context_is_toxic = any(word in lowered_context for word in SEVERE_OVERLAP_WORDS) or \
-                               any(word in lowered_context for word in CYBERBULLYING_WORDS) or \
-                               any(word in lowered_context for word in TOXIC_WORDS)
-            if context_is_toxic:
-                return {
-                    "label": "toxic",
-                    "probability": 0.92, # High confidence as it's a direct retaliation
-                    "cyberbullying_label": "cyberbullying",
-                    "cyberbullying_score": 0.92,
-                }
+    # --- Contextual Logic: Check for "mirroring" insults ---
+    # If the context contained ANY form of toxicity, a mirroring reply escalates it to a personal attack.
+    is_retaliation = _find_first_match(lexicon, matches, MIRRORING) is not None and context_is_toxic()
+    if is_retaliation:
+        return {
+            "label": "toxic",
+            "probability": 0.92, # High confidence as it's a direct retaliation
+            "cyberbullying_label": "cyberbullying",
+            "cyberbullying_score": 0.92,
+        }
 
     # --- Step 1: Check for exact keyword matches (100% confidence) ---
-    if lowered_text in SEVERE_OVERLAP_WORDS:
-        return {"label": "toxic", "probability": 1.0, "cyberbullying_label": "cyberbullying", "cyberbullying_score": 1.0}
-    if lowered_text in CYBERBULLYING_WORDS:
-        return {"label": "toxic", "probability": 1.0, "cyberbullying_label": "cyberbullying", "cyberbullying_score": 1.0}
-    if lowered_text in TOXIC_WORDS:
-        return {"label": "toxic", "probability": 1.0, "cyberbullying_label": "not cyberbullying", "cyberbullying_score": 0.0}
+    if exact_flags:
+        if exact_flags & SEVERE:
+            return {"label": "toxic", "probability": 1.0, "cyberbullying_label": "cyberbullying", "cyberbullying_score": 1.0}
+        if exact_flags & CYBERBULLYING:
+            return {"label": "toxic", "probability": 1.0, "cyberbullying_label": "cyberbullying", "cyberbullying_score": 1.0}
+        if exact_flags & TOXIC:
+            return {"label": "toxic", "probability": 1.0, "cyberbullying_label": "not cyberbullying", "cyberbullying_score": 0.0}
 
     # --- Step 2: Check for positive contexts that override toxic words ---
     # If a "bad word" is used in a known positive phrase, classify as non-toxic immediately.
-    if any(phrase in lowered_text for phrase in POSITIVE_CONTEXT_WORDS):
+    if _find_first_match(lexicon, matches, POSITIVE):
         return {"label": "non-toxic", "probability": 0.99, "cyberbullying_label": "not cyberbullying", "cyberbullying_score": 0.01}
 
     # --- Step 3: Check for keywords within a sentence (variable confidence) ---
-    matched_severe = _find_first_match(lowered_text, SEVERE_OVERLAP_WORDS)
-    matched_cyberbullying = _find_first_match(lowered_text, CYBERBULLYING_WORDS)
-    matched_toxic = _find_first_match(lowered_text, TOXIC_WORDS)
-
-    # --- Step 4: Apply logic based on flags ---
     # If severe words are present, it's the highest priority.
+    matched_severe = _find_first_match(lexicon, matches, SEVERE)
     if matched_severe:
         # Base score of 92%, with a more impactful bonus for longer phrases.
         score = min(0.99, 0.92 + len(matched_severe) * 0.004)
@@ -214,6 +267,7 @@ def get_classification_from_keywords(text: str, context: str = None) -> dict:
         }
     
     # If cyberbullying words are present (and no severe words), it's still toxic.
+    matched_cyberbullying = _find_first_match(lexicon, matches, CYBERBULLYING)
     if matched_cyberbullying:
         # Base score of 85%, creating a wider gap from severe.
         score = min(0.95, 0.85 + len(matched_cyberbullying) * 0.005)
@@ -225,6 +279,7 @@ def get_classification_from_keywords(text: str, context: str = None) -> dict:
         }
 
     # If only general toxic words are found.
+    matched_toxic = _find_first_match(lexicon, matches, TOXIC)
     if matched_toxic:
         # Base score of 75%, with a strong bonus for length to show variance.
         score = min(0.90, 0.75 + len(matched_toxic) * 0.008)
@@ -232,3 +287,30 @@ def get_classification_from_keywords(text: str, context: str = None) -> dict:
 
     # If no keywords from any list are found, it's clean.
     return {"label": "non-toxic", "probability": 0.99, "cyberbullying_label": "not cyberbullying", "cyberbullying_score": 0.01}
+
+    
+def get_classification_from_keywords(text: str, context: str = None, language: str = None) -> dict:
+    """
+    Classifies text based on keyword matching.
+    Follows a more nuanced hierarchy to improve accuracy.
+
+    The text is matched against every keyword list whatever its language; the
+    language is only reported (as result["language"]) for the rewriter. Pass
+    `language` (from language.detect_language) if it is already known, to avoid
+    detecting it twice.
+    """
+    lowered_text = text.lower().strip()
+    lowered_context = context.lower().strip() if context else ""
+    if language is None:
+        language = detect_language(lowered_text)
+
+    lexicon = get_lexicon()
+    matches = lexicon.scan(lowered_text)
+    result = _resolve_classification(
+        lowered_text,
+        matches,
+        lambda: bool(lowered_context) and _context_is_toxic(lowered_context),
+        lexicon,
+    )
+    result["language"] = language_from_matches(language, lexicon, matches, lowered_text)
+    return result
@@ -1,8 +1,7 @@
 import pandas as pd
 from config import get_classification_from_keywords  # Use keyword-based logic
-from sklearn.metrics import accuracy_score, confusion_matrix, ConfusionMatrixDisplay, classification_report
-import matplotlib.pyplot as plt
 from tqdm import tqdm
+import profiling
 
 def evaluate_model(text_column, sample_size=10000):
     """
@@ -63,7 +62,8 @@ def evaluate_model(text_column, sample_size=10000):
 
     print("Running predictions on the test set...")
     # Using tqdm for a progress bar
-    for index, row in tqdm(df.iterrows(), total=df.shape[0], desc="Predicting"):
+    # With PROFILE_MODE set, each batch of rows is profiled separately (see profiling.py).
+    for index, row in profiling.batches("evaluate", tqdm(df.iterrows(), total=df.shape[0], desc="Predicting")):
         text = row[text_column]
         
         prediction_result = get_classification_from_keywords(text)
@@ -80,6 +80,10 @@ def evaluate_model(text_column, sample_size=10000):
         true_cyberbullying_labels.append(row['true_cyberbullying_id'])
         pred_cyberbullying_labels.append(pred_cyber_id)
 
+    # sklearn and matplotlib are slow to import, so load them only once predictions are done.
+    from sklearn.metrics import accuracy_score, confusion_matrix, ConfusionMatrixDisplay, classification_report
+    import matplotlib.pyplot as plt
+
     # --- Metrics for TOXIC classification ---
     print("\n" + "="*50)
     print("      EVALUATION FOR: General Toxicity (toxic OR severe_toxic)")
@@ -1,8 +1,6 @@
 import pandas as pd
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-import matplotlib.pyplot as plt
-import seaborn as sns
 from config import get_classification_from_keywords
+import profiling
 
 def evaluate_model():
     """
@@ -23,10 +21,16 @@ def evaluate_model():
     df = df[df["toxic"] != -1].copy()
 
     # Get predictions from our keyword-based function
-    predictions = df["comment_text"].apply(get_classification_from_keywords)
+    with profiling.profile("evaluate_keyword_model"):
+        predictions = df["comment_text"].apply(get_classification_from_keywords)
     df["predicted_toxic"] = [p.get("label") == "toxic" for p in predictions]
     df["predicted_cyberbullying"] = [p.get("cyberbullying_label") == "cyberbullying" for p in predictions]
 
+    # sklearn, matplotlib and seaborn are slow to import, so load them only once predictions are done.
+    from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     # --- Evaluate Toxicity Detection ---
     print("\n" + "="*30)
     print("  TOXICITY DETECTION REPORT")
@@ -1,26 +1,59 @@
 import os
+import threading
 from typing import Dict, Any
-import google.generativeai as genai
-from dotenv import load_dotenv
-from google.api_core import exceptions
-from config import HINGLISH_KEYWORDS
+from language import detect_language, HINDI, HINGLISH_LANGUAGE
+from profiling import timed, timer
+
+# The Gemini SDK (and google.api_core / dotenv) take a noticeable amount of time
+# to import, so they are only loaded on first use. This keeps `import app` cheap
+# and lets a fresh worker serve keyword-only classification straight away.
+_genai = None
+_exceptions = None
+_load_lock = threading.Lock()
 
 
 def _configure() -> bool:
-    # Load environment variables from a .env file if it exists
-    # This is great for local development.
-    load_dotenv()
+    global _genai, _exceptions
+    if _genai is not None:
+        return True
+
+    with _load_lock:
+        if _genai is not None:
+            return True
+
+        # Load environment variables from a .env file if it exists
+        # This is great for local development.
+        from dotenv import load_dotenv
+        load_dotenv()
+
+        # Load the API key from an environment variable for security
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            # Only print this once to avoid spamming logs
+            print("[Gemini] ⚠️  GEMINI_API_KEY environment variable not set. Gemini suggestions will be disabled.")
+            return False
+
+        import google.generativeai as genai
+        from google.api_core import exceptions
+        genai.configure(api_key=api_key)
+        _exceptions = exceptions
+        _genai = genai
+        return True
+
+
+def is_ready() -> bool:
+    """True once the Gemini SDK has been imported and configured."""
+    return _genai is not None
+
 
-    # Load the API key from an environment variable for security
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        # Only print this once to avoid spamming logs
-        print("[Gemini] ⚠️  GEMINI_API_KEY environment variable not set. Gemini suggestions will be disabled.")
-        return False
-    genai.configure(api_key=api_key)
-    return True
+def preload() -> threading.Thread:
+    """Import and configure the Gemini SDK in a background thread."""
+    thread = threading.Thread(target=_configure, name="gemini-preload", daemon=True)
+    thread.start()
+    return thread
 
 
+@timed("gemini_suggester._extract_json")
 def _extract_json(text: str) -> Dict[str, Any]:
     import json
     if not text:
@@ -42,8 +75,11 @@ def _extract_json(text: str) -> Dict[str, Any]:
     return {}
 
 
-def suggest_with_gemini(text: str, context: str = None) -> Dict[str, Any]:
-    """Return a dict with keys: gemini_tips (list[str]), gemini_rewrite (str)."""
+def suggest_with_gemini(text: str, context: str = None, language: str = None) -> Dict[str, Any]:
+    """
+    Return a dict with keys: gemini_tips (list[str]), gemini_rewrite (str).
+    `language` is the code from language.detect_language; it is detected here if not given.
+    """
     if not _configure():
         return {"gemini_tips": [], "gemini_rewrite": ""}
 
@@ -56,9 +92,12 @@ def suggest_with_gemini(text: str, context: str = None) -> Dict[str, Any]:
         context_prompt = f"The user is replying to the following comment: \"{context.strip()}\".\n"
     
     # --- Dynamic Language for Rewrite ---
-    is_hinglish = any(word in text.lower() for word in HINGLISH_KEYWORDS)
-    if is_hinglish:
+    if language is None:
+        language = detect_language(text)
+    if language == HINGLISH_LANGUAGE:
         rewrite_language_instruction = "Provide one polite rewrite in Hinglish (Hindi written in English script). For example, if the input is 'tu idiot hai', the rewrite could be 'Aapki baat samajh nahi aayi'."
+    elif language == HINDI:
+        rewrite_language_instruction = "Provide one polite rewrite in Hindi (Devanagari script)."
     else:
         rewrite_language_instruction = "Provide one polite rewrite in simple English."
 
@@ -74,15 +113,16 @@ def suggest_with_gemini(text: str, context: str = None) -> Dict[str, Any]:
     for model_name in models_to_try:
         try:
             print(f"[Gemini] Attempting to use model: {model_name}")
-            model = genai.GenerativeModel(model_name)
-            resp = model.generate_content(prompt)
+            model = _genai.GenerativeModel(model_name)
+            with timer("gemini_suggester.generate_content"):
+                resp = model.generate_content(prompt)
             content = getattr(resp, "text", None)
             parsed = _extract_json(content or "")
             return {
                 "gemini_tips": [t for t in (parsed.get("tips") or []) if isinstance(t, str)][:5],
                 "gemini_rewrite": parsed.get("rewrite") or "" if isinstance(parsed.get("rewrite"), str) else "",
             }
-        except exceptions.ResourceExhausted as e:
+        except _exceptions.ResourceExhausted as e:
             print(f"[Gemini] ⚠️  Rate limit likely reached for {model_name}. Trying next model...")
             continue # Move to the next model in the list
 
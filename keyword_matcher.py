@@ -0,0 +1,161 @@
+# keyword_matcher.py
+
+"""
+Incremental keyword matching for live (as-you-type) classification.
+
+Matching runs on the Aho-Corasick automaton of the shared lexicon (lexicon.py).
+The matcher state after every character of the text is kept, so an
+edit only has to rewind to the edit point and feed the new characters: the
+cost of a keystroke depends on the size of the edit, not the comment length.
+"""
+
+from array import array
+
+from config import _context_is_toxic, _resolve_classification
+from language import ENGLISH, HINGLISH_LANGUAGE, counts_as_hinglish, is_marker, language_from_counts
+from lexicon import HINGLISH, Lexicon, get_lexicon
+
+# Fields kept for every prefix of the text, stored back to back in one flat array.
+_STATE, _NON_SPACE, _LATIN, _DEVANAGARI, _WORD_START, _LOWERED_LENGTH = range(6)
+_FIELDS = 6
+
+
+class IncrementalClassifier:
+    """
+    Keeps the matcher state for one piece of text that is being edited.
+
+    The text is updated with `update(keep, append)`: the first `keep` characters
+    (code points) of the current text are kept and `append` is added after them. Typing adds
+    characters at the end (keep == current length), a backspace drops one
+    (keep == current length - 1, append == ""), and an edit in the middle is
+    sent as the common prefix plus the rest of the new text.
+
+    The language of the text (reported for the rewriter, as in
+    get_classification_from_keywords) is tracked incrementally as well.
+    """
+
+    def __init__(self, context: str = None, lexicon: Lexicon = None):
+        self.lexicon = lexicon or get_lexicon()
+        self._text = ""         # the lowered text
+        # For each prefix of the text: automaton state, non-whitespace characters,
+        # Latin letters, Devanagari characters, start of the unfinished word (-1 if
+        # none) and length of the lowered prefix. Lowering can change the length of
+        # the text ("İ" lowers to two characters), so positions in the lowered text
+        # are kept separately from the character offsets the client sends.
+        self._prefixes = array("i", [0, 0, 0, 0, -1, 0])
+        self._hits = array("I")     # end position and word id of every match, in text order
+        self._matched = {}          # word id -> number of occurrences in the text
+        self._markers = array("I")  # end position of every finished Hinglish marker word
+        self._hinglish_hits = 0     # matches for which language.counts_as_hinglish holds
+        self.context = None
+        self._context_is_toxic = False
+        self.set_context(context)
+
+    def __len__(self) -> int:
+        """Length of the text in code points, the unit of `keep`."""
+        return len(self._prefixes) // _FIELDS - 1
+
+    def set_context(self, context: str = None):
+        """Sets the parent comment the text is replying to."""
+        if context == self.context:
+            return
+        self.context = context
+        lowered_context = context.lower().strip() if context else ""
+        self._context_is_toxic = bool(lowered_context and _context_is_toxic(lowered_context))
+
+    def update(self, keep: int, append: str = "") -> dict:
+        """
+        Applies an edit and returns the classification of the resulting text.
+
+        Raises:
+            ValueError: If `keep` is not between 0 and the current text length.
+        """
+        if not 0 <= keep <= len(self):
+            raise ValueError(f"keep must be between 0 and {len(self)}, got {keep}")
+
+        # Rewind to the edit point, dropping matches that ended after it.
+        prefixes = self._prefixes
+        lowered_keep = prefixes[keep * _FIELDS + _LOWERED_LENGTH]
+        hits = self._hits
+        while hits and hits[-2] > lowered_keep:
+            word_id = hits.pop()
+            end = hits.pop()
+            if self._is_hinglish_hit(end, word_id, self._text):
+                self._hinglish_hits -= 1
+            self._matched[word_id] -= 1
+            if not self._matched[word_id]:
+                del self._matched[word_id]
+        while self._markers and self._markers[-1] > lowered_keep:
+            self._markers.pop()
+        text = self._text[:lowered_keep]
+        del prefixes[(keep + 1) * _FIELDS:]
+
+        # Feed only the new characters.
+        lexicon = self.lexicon
+        state, non_space, latin, devanagari, word_start, position = prefixes[-_FIELDS:]
+        word = text[word_start:] if word_start >= 0 else ""  # the unfinished word
+        added = []
+        for original in append:
+            for ch in original.lower():
+                position += 1
+                state = lexicon.step(state, ch)
+                if "a" <= ch <= "z":
+                    latin += 1
+                    if word_start < 0:
+                        word_start = position - 1
+                    word += ch
+                else:
+                    if word_start >= 0:
+                        if is_marker(word):
+                            self._markers.append(position)
+                        word_start = -1
+                        word = ""
+                    if "\u0900" <= ch <= "\u097f":
+                        devanagari += 1
+                if not ch.isspace():
+                    non_space += 1
+                added.append(ch)
+                for word_id in lexicon.outputs(state):
+                    hits.append(position)
+                    hits.append(word_id)
+                    self._matched[word_id] = self._matched.get(word_id, 0) + 1
+                    if self._is_hinglish_hit(position, word_id, text, added):
+                        self._hinglish_hits += 1
+            prefixes.extend((state, non_space, latin, devanagari, word_start, position))
+        self._text = text + "".join(added)
+
+        return self.classify()
+
+    def _is_hinglish_hit(self, end: int, word_id: int, text: str, added=()) -> bool:
+        """counts_as_hinglish for a match ending at `end` of the lowered text `text` + `added`."""
+        if not self.lexicon.word_flags(word_id) & HINGLISH:
+            return False
+        before = end - len(self.lexicon.word(word_id)) - 1
+        if before < 0:
+            previous_char = ""
+        elif before < len(text):
+            previous_char = text[before]
+        else:
+            previous_char = added[before - len(text)]
+        return counts_as_hinglish(self.lexicon, word_id, previous_char)
+
+    def language(self) -> str:
+        """The language of the current text, as get_classification_from_keywords reports it."""
+        prefix = self._prefixes[-_FIELDS:]
+        word_start = prefix[_WORD_START]
+        has_marker = bool(self._markers) or (word_start >= 0 and is_marker(self._text[word_start:]))
+        language = language_from_counts(prefix[_DEVANAGARI], prefix[_LATIN], has_marker)
+        if language == ENGLISH and self._hinglish_hits:
+            return HINGLISH_LANGUAGE
+        return language
+
+    def classify(self) -> dict:
+        """Classifies the current text, like config.get_classification_from_keywords."""
+        # An exact match is only possible for short texts, so avoid stripping the text otherwise.
+        lowered_text = None
+        if self._prefixes[-_FIELDS + _NON_SPACE] <= self.lexicon.max_word_length:
+            lowered_text = self._text.strip()
+
+        result = _resolve_classification(lowered_text, self._matched, lambda: self._context_is_toxic, self.lexicon)
+        result["language"] = self.language()
+        return result
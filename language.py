@@ -0,0 +1,107 @@
+# language.py
+
+"""
+Cheap language/script identification, run once per request.
+
+The result decides which language Gemini is asked to rewrite in. It does not
+affect classification: every comment is matched against all keyword lists.
+
+    "hi"       -> mostly Devanagari script
+    "hinglish" -> Latin script with at least one Hinglish word, or a word
+                  starting with a Hinglish keyword (see language_from_matches)
+    "en"       -> everything else
+
+Hinglish words are found with a set lookup per token, so detection is a single
+regex pass over the text plus one hash lookup per word.
+"""
+
+import re
+
+from lexicon import get_lexicon, HINGLISH
+from profiling import timed
+
+ENGLISH = "en"
+HINGLISH_LANGUAGE = "hinglish"
+HINDI = "hi"
+
+_TOKEN = re.compile(r"[a-z]+")
+_LATIN_LETTER = re.compile(r"[a-z]")
+_DEVANAGARI = re.compile(r"[\u0900-\u097f]")
+
+# Shorter Hinglish keywords, or ones found inside a longer word ("abe" in "label",
+# "hatt" in "manhattan"), don't make a comment Hinglish.
+MIN_HINGLISH_MATCH_LENGTH = 4
+
+_marker_tokens = None
+
+
+def _get_marker_tokens() -> frozenset:
+    """Hinglish marker words from config.py plus every word of the Hinglish keywords."""
+    global _marker_tokens
+    if _marker_tokens is None:
+        import config
+
+        keyword_tokens = {token for word in get_lexicon().words(HINGLISH) for token in _TOKEN.findall(word)}
+        _marker_tokens = frozenset(
+            (keyword_tokens | config.HINGLISH_MARKER_WORDS) - config.ENGLISH_LOOKALIKE_WORDS
+        )
+    return _marker_tokens
+
+
+def is_marker(token: str) -> bool:
+    """True if a lowered `[a-z]+` token marks a comment as Hinglish."""
+    return token in _get_marker_tokens()
+
+
+def language_from_counts(devanagari: int, latin: int, has_marker: bool) -> str:
+    """The detection rule, shared with the incremental matcher."""
+    if devanagari > latin:
+        return HINDI
+    if has_marker:
+        return HINGLISH_LANGUAGE
+    return ENGLISH
+
+
+@timed("language.detect_language")
+def detect_language(text: str) -> str:
+    """Returns the language code of a comment ("en", "hinglish" or "hi")."""
+    lowered = text.lower()
+    devanagari = 0 if lowered.isascii() else len(_DEVANAGARI.findall(lowered))
+    latin = len(_LATIN_LETTER.findall(lowered)) if devanagari else 0
+    has_marker = not _get_marker_tokens().isdisjoint(_TOKEN.findall(lowered))
+    return language_from_counts(devanagari, latin, has_marker)
+
+
+def counts_as_hinglish(lexicon, word_id: int, previous_char: str) -> bool:
+    """
+    True if a match of keyword `word_id` makes a comment Hinglish: the keyword is
+    a Hinglish one of at least MIN_HINGLISH_MATCH_LENGTH characters, and the
+    match starts a word (`previous_char` is the character before it, "" at the start).
+    """
+    return (
+        bool(lexicon.word_flags(word_id) & HINGLISH)
+        and not previous_char.isalnum()
+        and len(lexicon.word(word_id)) >= MIN_HINGLISH_MATCH_LENGTH
+    )
+
+
+def language_from_matches(language: str, lexicon, matches, lowered_text: str) -> str:
+    """
+    Marks an English comment as Hinglish if a Hinglish keyword starts one of its
+    words (see counts_as_hinglish).
+
+    Keywords are matched as substrings, so this also catches spellings the
+    whole-word check misses, such as "chutiyaaa".
+    """
+    if language != ENGLISH:
+        return language
+    for word_id in matches:
+        if not lexicon.word_flags(word_id) & HINGLISH:
+            continue
+        word = lexicon.word(word_id)
+        start = lowered_text.find(word)
+        while start >= 0:
+            if counts_as_hinglish(lexicon, word_id, lowered_text[start - 1] if start else ""):
+                return HINGLISH_LANGUAGE
+            start = lowered_text.find(word, start + 1)
+    return language
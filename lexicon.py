@@ -0,0 +1,370 @@
+# lexicon.py
+
+"""
+Compact, shared keyword lexicon.
+
+Every keyword is stored once, with a bitmask of the categories it belongs to
+(a word can be both SEVERE and CYBERBULLYING, or CYBERBULLYING and HINGLISH).
+The store holds the sorted word table and an Aho-Corasick automaton for
+substring matching, all in flat arrays:
+
+    offsets, flags, blob     -> word table (UTF-8 blob, binary-searchable)
+    edge_index, edge_chars,
+    edge_targets, fail       -> automaton transitions and failure links
+    out_index, out_words     -> words ending at each automaton state
+
+Because there are no per-word Python objects, the store can be saved to a file
+and loaded with mmap (see `Lexicon.load`): every worker maps the same pages. A
+store built in-process before the server forks (e.g. `gunicorn --preload`) is
+shared copy-on-write, since its array buffers are never written to.
+
+To compile config.py plus extra word lists into a file for `LEXICON_PATH`:
+    python lexicon.py lexicon.bin extra_words.tsv ...
+where each TSV line is `<keyword>\\t<category>[,<category>...]`.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+from profiling import timed
+
+# --- Category flags ---
+SEVERE = 1 << 0
+CYBERBULLYING = 1 << 1
+TOXIC = 1 << 2
+POSITIVE = 1 << 3
+MIRRORING = 1 << 4
+HINGLISH = 1 << 5
+THREAT = 1 << 6
+
+CATEGORY_FLAGS = {
+    "severe": SEVERE,
+    "cyberbullying": CYBERBULLYING,
+    "toxic": TOXIC,
+    "positive": POSITIVE,
+    "mirroring": MIRRORING,
+    "hinglish": HINGLISH,
+    "threat": THREAT,
+}
+
+ANY_TOXIC = SEVERE | CYBERBULLYING | TOXIC
+
+_MAGIC = b"TXLX"
+_VERSION = 1
+# magic, version, little-endian?, words, blob bytes, states, edges, outputs, max word length
+_HEADER = struct.Struct("<4sHHIIIIII")
+_HEADER_SIZE = 64
+
+# Transitions from the first states are memoized per process in one flat array of
+# at most this many entries (4 bytes each, so 128 KB). States are numbered
+# breadth-first, so these are the shallowest states, which almost every character
+# of a text passes through. Other transitions are resolved through the arrays.
+_MEMO_SIZE = 1 << 15
+
+
+class Lexicon:
+    """Read-only keyword store. Build with `Lexicon.build` or load with `Lexicon.load`."""
+
+    def __init__(self, arrays: dict, blob, max_word_length: int, _mmap=None):
+        self._offsets = arrays["offsets"]
+        self._flags = arrays["flags"]
+        self._edge_index = arrays["edge_index"]
+        self._edge_chars = arrays["edge_chars"]
+        self._edge_targets = arrays["edge_targets"]
+        self._fail = arrays["fail"]
+        self._out_index = arrays["out_index"]
+        self._out_words = arrays["out_words"]
+        self._blob = blob
+        self._mmap = _mmap
+        # Characters that appear in some keyword, numbered. Any other character leads back to the root.
+        self._columns = {chr(code): i for i, code in enumerate(sorted(set(self._edge_chars)))}
+        self._memo_states = min(len(self._fail), _MEMO_SIZE // max(len(self._columns), 1))
+        self._memo = array("i", [-1]) * (self._memo_states * len(self._columns))
+        self.max_word_length = max_word_length
+
+    # Order of the arrays in a saved file, with their typecodes.
+    _LAYOUT = (
+        ("offsets", "I"), ("edge_index", "I"), ("edge_chars", "I"), ("edge_targets", "I"),
+        ("fail", "I"), ("out_index", "I"), ("out_words", "I"), ("flags", "H"),
+    )
+
+    @classmethod
+    def build(cls, entries: dict) -> "Lexicon":
+        """
+        Builds a store from a {keyword: category flags} mapping.
+
+        Word ids follow the sorted order of the keywords, so they are stable for a
+        given set of entries regardless of insertion order or hash seed.
+        """
+        words = sorted(word for word, flags in entries.items() if word and flags)
+        encoded = [word.encode("utf-8") for word in words]
+        offsets = array("I", [0])
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        flags = array("H", (entries[word] for word in words))
+
+        # Build the automaton with temporary dicts, then flatten it into arrays.
+        goto, fail, out = [{}], [0], [[]]
+        for word_id, word in enumerate(words):
+            state = 0
+            for ch in word:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto.append({})
+                    fail.append(0)
+                    out.append([])
+                    goto[state][ch] = next_state
+                state = next_state
+            out[state].append(word_id)
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                fail[next_state] = f
+                out[next_state].extend(out[f])
+
+        # Renumber the states breadth-first (see _MEMO_SIZE), then flatten into arrays.
+        order = [0]
+        for state in order:
+            order.extend(goto[state][ch] for ch in sorted(goto[state]))
+        new_id = {state: i for i, state in enumerate(order)}
+
+        edge_index, edge_chars, edge_targets = array("I", [0]), array("I"), array("I")
+        out_index, out_words = array("I", [0]), array("I")
+        for state in order:
+            edges = goto[state]
+            for ch in sorted(edges):
+                edge_chars.append(ord(ch))
+                edge_targets.append(new_id[edges[ch]])
+            edge_index.append(len(edge_chars))
+            out_words.extend(sorted(out[state]))
+            out_index.append(len(out_words))
+
+        arrays = {
+            "offsets": offsets, "flags": flags,
+            "edge_index": edge_index, "edge_chars": edge_chars, "edge_targets": edge_targets,
+            "fail": array("I", (new_id[fail[state]] for state in order)),
+            "out_index": out_index, "out_words": out_words,
+        }
+        max_word_length = max((len(word) for word in words), default=0)
+        return cls(arrays, b"".join(encoded), max_word_length)
+
+    def save(self, path: str):
+        """Writes the store to a file that `Lexicon.load` can map."""
+        header = _HEADER.pack(
+            _MAGIC, _VERSION, sys.byteorder == "little",
+            len(self), len(self._blob), len(self._fail), len(self._edge_chars),
+            len(self._out_words), self.max_word_length,
+        )
+        with open(path, "wb") as f:
+            f.write(header.ljust(_HEADER_SIZE, b"\0"))
+            for name, _ in self._LAYOUT:
+                f.write(bytes(getattr(self, "_" + name)))
+            f.write(bytes(self._blob))
+
+    @classmethod
+    def load(cls, path: str) -> "Lexicon":
+        """Maps a saved store into memory without copying it."""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, little_endian, n_words, blob_len, n_states, n_edges, n_outputs, max_word_length = \
+            _HEADER.unpack_from(mm)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a lexicon file (version {_VERSION})")
+        if bool(little_endian) != (sys.byteorder == "little"):
+            raise ValueError(f"{path} was built on a machine with a different byte order")
+
+        lengths = {
+            "offsets": n_words + 1, "edge_index": n_states + 1, "edge_chars": n_edges,
+            "edge_targets": n_edges, "fail": n_states, "out_index": n_states + 1,
+            "out_words": n_outputs, "flags": n_words,
+        }
+        view = memoryview(mm)
+        position = _HEADER_SIZE
+        arrays = {}
+        for name, typecode in cls._LAYOUT:
+            size = lengths[name] * array(typecode).itemsize
+            arrays[name] = view[position:position + size].cast(typecode)
+            position += size
+        return cls(arrays, view[position:position + blob_len], max_word_length, _mmap=mm)
+
+    # --- Word table ---
+
+    def __len__(self) -> int:
+        return len(self._flags)
+
+    def word(self, word_id: int) -> str:
+        return bytes(self._blob[self._offsets[word_id]:self._offsets[word_id + 1]]).decode("utf-8")
+
+    def words(self, flag: int = 0):
+        """Yields (in word id order) every keyword that has any of the given flags, or all keywords."""
+        for word_id in range(len(self)):
+            if not flag or self._flags[word_id] & flag:
+                yield self.word(word_id)
+
+    def word_flags(self, word_id: int) -> int:
+        return self._flags[word_id]
+
+    def flags(self, word: str) -> int:
+        """Returns the category flags of an exact keyword, or 0 if it is not in the lexicon."""
+        key = word.encode("utf-8")
+        blob, offsets = self._blob, self._offsets
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = bytes(blob[offsets[mid]:offsets[mid + 1]])
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                return self._flags[mid]
+        return 0
+
+    def __contains__(self, word: str) -> bool:
+        return self.flags(word) != 0
+
+    # --- Substring matching ---
+
+    def _resolve_step(self, state: int, ch: str) -> int:
+        code = ord(ch)
+        edge_index, edge_chars = self._edge_index, self._edge_chars
+        while True:
+            lo, hi = edge_index[state], edge_index[state + 1]
+            i = bisect_left(edge_chars, code, lo, hi)
+            if i < hi and edge_chars[i] == code:
+                return self._edge_targets[i]
+            if not state:
+                return 0
+            state = self._fail[state]
+
+    def step(self, state: int, ch: str) -> int:
+        """Returns the automaton state reached from `state` after reading `ch`."""
+        column = self._columns.get(ch)
+        if column is None:
+            return 0
+        if state < self._memo_states:
+            i = state * len(self._columns) + column
+            next_state = self._memo[i]
+            if next_state < 0:
+                next_state = self._memo[i] = self._resolve_step(state, ch)
+            return next_state
+        return self._resolve_step(state, ch)
+
+    def outputs(self, state: int):
+        """Returns the ids of all keywords that end at `state`."""
+        return self._out_words[self._out_index[state]:self._out_index[state + 1]]
+
+    @timed("lexicon.scan")
+    def scan(self, text: str) -> dict:
+        """Returns {word id: occurrences} for every keyword found as a substring of `text`."""
+        matches = {}
+        state = 0
+        columns, memo, memo_states, out_index = self._columns, self._memo, self._memo_states, self._out_index
+        n_columns = len(columns)
+        for ch in text:
+            # Same as `state = self.step(state, ch)`, inlined for speed.
+            column = columns.get(ch)
+            if column is None:
+                state = 0
+                continue
+            if state < memo_states:
+                i = state * n_columns + column
+                next_state = memo[i]
+                if next_state < 0:
+                    next_state = memo[i] = self._resolve_step(state, ch)
+                state = next_state
+            else:
+                state = self._resolve_step(state, ch)
+            if out_index[state] != out_index[state + 1]:
+                for word_id in self.outputs(state):
+                    matches[word_id] = matches.get(word_id, 0) + 1
+        return matches
+
+
+def normalize_keyword(word: str) -> str:
+    """Keywords are matched against lowered text, so they are stored lowered and stripped too."""
+    return word.strip().lower()
+
+
+def default_entries() -> dict:
+    """Collects the keyword lists from config.py into {keyword: category flags}."""
+    import config
+
+    entries = {}
+    for words, flag in (
+        (config.SEVERE_OVERLAP_WORDS, SEVERE),
+        (config.CYBERBULLYING_WORDS, CYBERBULLYING),
+        (config.TOXIC_WORDS, TOXIC),
+        (config.POSITIVE_CONTEXT_WORDS, POSITIVE),
+        (config.MIRRORING_PHRASES, MIRRORING),
+        (config.HINGLISH_KEYWORDS, HINGLISH),
+        (config.THREAT_PHRASES, THREAT),
+    ):
+        for word in words:
+            word = normalize_keyword(word)
+            if word:
+                entries[word] = entries.get(word, 0) | flag
+    return entries
+
+
+def read_entries(path: str, entries: dict = None) -> dict:
+    """Adds the keywords from a `<keyword>\\t<category>[,<category>...]` TSV file to `entries`."""
+    entries = {} if entries is None else entries
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            word, _, categories = line.partition("\t")
+            word = normalize_keyword(word)
+            if not word:
+                raise ValueError(f"{path}:{line_number}: empty keyword")
+            flag = 0
+            for name in categories.split(","):
+                if name.strip() not in CATEGORY_FLAGS:
+                    raise ValueError(f"{path}:{line_number}: unknown category '{name.strip()}'")
+                flag |= CATEGORY_FLAGS[name.strip()]
+            entries[word] = entries.get(word, 0) | flag
+    return entries
+
+
+_lexicon = None
+
+
+def get_lexicon() -> Lexicon:
+    """
+    Returns the process-wide lexicon: the compiled file at LEXICON_PATH if set,
+    otherwise a store built from the config.py keyword lists.
+    """
+    global _lexicon
+    if _lexicon is None:
+        path = os.environ.get("LEXICON_PATH")
+        _lexicon = Lexicon.load(path) if path else Lexicon.build(default_entries())
+    return _lexicon
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python lexicon.py <output.bin> [extra_words.tsv ...]")
+        sys.exit(1)
+
+    all_entries = default_entries()
+    for extra_path in sys.argv[2:]:
+        read_entries(extra_path, all_entries)
+    lexicon = Lexicon.build(all_entries)
+    lexicon.save(sys.argv[1])
+    print(f"✅ Saved {len(lexicon)} keywords to '{sys.argv[1]}' ({os.path.getsize(sys.argv[1]):,} bytes)")
+
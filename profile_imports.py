@@ -0,0 +1,68 @@
+import re
+import subprocess
+import sys
+
+# Entry points to profile. Each one is imported in a fresh interpreter so the
+# numbers reflect a real cold start and are not skewed by already-cached modules.
+ENTRY_POINTS = [
+    "app",
+    "evaluate",
+    "evaluate_keyword_model",
+    "generate_rewriter_report",
+    "generate_test_data",
+]
+
+TOP_N = 10
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_module(module_name):
+    """
+    Imports a module under `python -X importtime` and parses the report.
+
+    Returns:
+        tuple: (total_us, rows) where rows is a list of (cumulative_us, self_us, depth, name),
+               or (None, error_message) if the import failed.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        last_line = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "unknown error"
+        return None, last_line
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            depth = (len(indent) - 1) // 2
+            rows.append((int(cumulative_us), int(self_us), depth, name))
+
+    total_us = sum(row[0] for row in rows if row[2] == 0)
+    return total_us, rows
+
+
+def main():
+    print("⏱️  Profiling import time of each entry point...")
+    for module_name in ENTRY_POINTS:
+        total_us, rows = profile_module(module_name)
+        print("\n" + "="*50)
+        print(f"  {module_name}")
+        print("="*50)
+        if total_us is None:
+            print(f"❌ Import failed: {rows}")
+            continue
+
+        print(f"Total import time: {total_us / 1000:.1f} ms")
+        print("Slowest top-level imports:")
+        top_level = sorted((row for row in rows if row[2] == 0), reverse=True)[:TOP_N]
+        for cumulative_us, _, _, name in top_level:
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+# profiling.py
+
+"""
+Opt-in profiling for the Flask app and the evaluation scripts.
+
+Profiling is off unless PROFILE_MODE is set, and then costs nothing: `timed`
+returns the function unchanged and `timer` returns a shared no-op context.
+
+    PROFILE_MODE=all       profile every request / evaluation batch
+    PROFILE_MODE=header    profile only requests sent with `X-Profile: <PROFILE_TOKEN>`
+    PROFILE_MODE=0.05      profile a random 5% of requests / batches
+    PROFILE_TOKEN          shared secret for header mode (required; without it
+                           header mode profiles nothing)
+    PROFILE_DIR            output directory (default: profiles)
+    PROFILE_FORMAT         "collapsed" (default, for flamegraph.pl / speedscope)
+                           or "speedscope" (speedscope JSON)
+    PROFILE_INTERVAL_MS    sampling interval (default: 5)
+
+Each profiled request or batch writes a stack file from a sampling profiler
+(a background thread reading the profiled thread's stack at a fixed interval)
+and a `.timings.json` file with per-call timings of the functions and blocks
+wrapped with `timed` / `timer` while it ran.
+"""
+
+import contextlib
+import functools
+import hmac
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "").strip().lower()
+ENABLED = PROFILE_MODE not in ("", "0", "off", "false")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_FORMAT = os.environ.get("PROFILE_FORMAT", "collapsed").strip().lower()
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+
+if PROFILE_MODE == "header" and not PROFILE_TOKEN:
+    print("[Profile] ⚠️  PROFILE_MODE=header needs PROFILE_TOKEN; no requests will be profiled.")
+
+_local = threading.local()
+_sequence = itertools.count()
+_NULL = contextlib.nullcontext()
+
+
+def should_profile(header_value: str = None) -> bool:
+    """Decides whether to profile one request or batch. `header_value` is the X-Profile header."""
+    if not ENABLED:
+        return False
+    if PROFILE_MODE == "all":
+        return True
+    if PROFILE_MODE == "header":
+        # Profiles cost a sampler thread and two file writes, so only holders of the token may ask.
+        return bool(PROFILE_TOKEN) and header_value is not None and hmac.compare_digest(
+            header_value.strip().encode(), PROFILE_TOKEN.encode()
+        )
+    try:
+        return random.random() < float(PROFILE_MODE)
+    except ValueError:
+        return False
+
+
+# --- Per-call timings ---
+
+def _record(timings: dict, name: str, elapsed: float):
+    entry = timings.get(name)
+    if entry is None:
+        timings[name] = [1, elapsed, elapsed]
+    else:
+        entry[0] += 1
+        entry[1] += elapsed
+        if elapsed > entry[2]:
+            entry[2] = elapsed
+
+
+def timed(name: str):
+    """Decorator recording the duration of every call made while a profile is active."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = getattr(_local, "timings", None)
+            if timings is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(timings, name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class _Timer:
+    __slots__ = ("name", "timings", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = getattr(_local, "timings", None)
+        if self.timings is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            _record(self.timings, self.name, time.perf_counter() - self.start)
+        return False
+
+
+def timer(name: str):
+    """Context manager recording the duration of a block, like `timed` for functions."""
+    return _Timer(name) if ENABLED else _NULL
+
+
+# --- Sampling profiler ---
+
+class SamplingProfiler:
+    """Samples the stack of one thread from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()  # stack (root first) -> number of samples
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def write_collapsed(self, path: str):
+        """Writes `frame;frame;frame count` lines, as used by flamegraph.pl and speedscope."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+    def write_speedscope(self, path: str, name: str):
+        """Writes a speedscope (https://www.speedscope.app) sampled profile."""
+        frame_ids = {}
+        samples, weights = [], []
+        for stack, count in self.samples.most_common():
+            samples.append([frame_ids.setdefault(frame, len(frame_ids)) for frame in stack])
+            weights.append(count * self.interval * 1000)
+        profile = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": frame} for frame in frame_ids]},
+            "profiles": [{
+                "type": "sampled", "name": name, "unit": "milliseconds",
+                "startValue": 0, "endValue": sum(weights),
+                "samples": samples, "weights": weights,
+            }],
+            "name": name,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(profile, f)
+
+
+class ProfileSession:
+    """One profiled request or batch: sampled stacks plus per-call timings."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.profiler = SamplingProfiler(threading.get_ident())
+
+    def start(self) -> "ProfileSession":
+        self._previous_timings = getattr(_local, "timings", None)
+        _local.timings = self.timings = {}
+        self.started = time.perf_counter()
+        self.profiler.start()
+        return self
+
+    def stop(self) -> str:
+        """Stops profiling and writes the output files. Returns the path prefix used."""
+        self.profiler.stop()
+        duration = time.perf_counter() - self.started
+        _local.timings = self._previous_timings
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe_name = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in self.name)
+        prefix = os.path.join(
+            PROFILE_DIR, f"{safe_name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}"
+        )
+        if PROFILE_FORMAT == "speedscope":
+            self.profiler.write_speedscope(prefix + ".speedscope.json", self.name)
+        else:
+            self.profiler.write_collapsed(prefix + ".folded")
+
+        report = {
+            "name": self.name,
+            "duration_ms": round(duration * 1000, 3),
+            "samples": sum(self.profiler.samples.values()),
+            "timings": {
+                name: {
+                    "calls": calls,
+                    "total_ms": round(total * 1000, 3),
+                    "mean_ms": round(total / calls * 1000, 4),
+                    "max_ms": round(longest * 1000, 3),
+                }
+                for name, (calls, total, longest) in sorted(self.timings.items(), key=lambda item: -item[1][1])
+            },
+        }
+        with open(prefix + ".timings.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[Profile] 📈 Wrote '{prefix}.*' ({report['samples']} samples, {report['duration_ms']} ms)")
+        return prefix
+
+
+@contextlib.contextmanager
+def profile(name: str, header_value: str = None):
+    """Profiles the enclosed block if `should_profile` picks it."""
+    if not should_profile(header_value):
+        yield None
+        return
+    session = ProfileSession(name).start()
+    try:
+        yield session
+    finally:
+        session.stop()
+
+
+def batches(name: str, iterable, batch_size: int = 1000):
+    """
+    Yields the items of `iterable`, profiling each batch of `batch_size` items
+    as a separate session. Returns `iterable` untouched when profiling is off.
+    """
+    if not ENABLED:
+        return iterable
+    return _profiled_batches(name, iterable, batch_size)
+
+
+def _profiled_batches(name, iterable, batch_size):
+    session = None
+    try:
+        for i, item in enumerate(iterable):
+            if i % batch_size == 0:
+                if session is not None:
+                    session.stop()
+                session = ProfileSession(f"{name}-batch{i // batch_size}").start() if should_profile() else None
+            yield item
+    finally:
+        if session is not None:
+            session.stop()
@@ -1,17 +1,8 @@
 # recommendations.py
 
-_INSULT_WORDS = {
-    "idiot": "person", "moron": "person", "stupid": "unhelpful",
-    "dumb": "unclear", "retard": "person", "loser": "person",
-    "ugly": "not nice", "fat": "overweight", "worthless": "not helpful",
-}
-
-_SEVERE_THREATS = {
-    "kill yourself", "kys", "go die", "drink bleach", "hang yourself",
-    "i will kill you", "i'll kill you", "i will find you", "i'll find you",
-    "i will beat you", "i'll beat you", "i will hurt you", "i'll hurt you",
-    "you're dead", "i hope you die",
-}
+from config import INSULT_REPLACEMENTS
+from lexicon import get_lexicon, THREAT
+from profiling import timer
 
 def generate_recommendations(text: str, result: dict) -> dict:
     """Generates polite rewrite suggestions based on a set of rules."""
@@ -36,7 +27,8 @@ def generate_recommendations(text: str, result: dict) -> dict:
         suggestions.append("Reframe from \"you\" statements to \"I\" statements (e.g., \"I think\").")
 
     # De-threaten
-    is_severe_threat = any(p in lowered for p in _SEVERE_THREATS)
+    lexicon = get_lexicon()
+    is_severe_threat = any(lexicon.word_flags(word_id) & THREAT for word_id in lexicon.scan(lowered))
     if is_severe_threat:
         suggestions.append("Remove threats; state a boundary or request politely.")
         return {
@@ -54,10 +46,11 @@ def generate_recommendations(text: str, result: dict) -> dict:
 
     # 2. Word-level softening for common insults
     tokens = polite.split()
-    for i, tok in enumerate(tokens):
-        key = tok.lower().strip(",.!?;:")
-        if key in _INSULT_WORDS:
-            tokens[i] = _INSULT_WORDS[key]
+    with timer("recommendations.rewrite_loop"):
+        for i, tok in enumerate(tokens):
+            key = tok.lower().strip(",.!?;:")
+            if key in INSULT_REPLACEMENTS:
+                tokens[i] = INSULT_REPLACEMENTS[key]
     polite = " ".join(tokens)
 
     # 3. Add a polite opening if the comment is still aggressive
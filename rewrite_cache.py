@@ -0,0 +1,68 @@
+# rewrite_cache.py
+
+"""
+Precomputed rewrites for the most frequent toxic comments.
+
+Most toxic traffic repeats a small set of short phrases. build_rewrite_cache.py
+asks Gemini for rewrites of those phrases offline and stores the results in
+rewrite_cache.json, which ships with the app. At request time a hit is a single dict lookup, so only long-tail text needs a
+live Gemini call.
+
+Cached rewrites are written without a parent comment, so they are only served
+for comments sent without context.
+"""
+
+import json
+import os
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rewrite_cache.json")
+# Version 2 tables hold Gemini rewrites only (version 1 could hold local-rule ones).
+FORMAT_VERSION = 2
+
+_entries = None
+
+
+def normalize(text: str) -> str:
+    """The cache key for a comment: lowered, with whitespace collapsed."""
+    return " ".join(text.lower().split())
+
+
+def load(path: str = None) -> dict:
+    """Loads (once) and returns the {normalized text: recommendations} table."""
+    global _entries
+    if _entries is None:
+        path = path or os.environ.get("REWRITE_CACHE_PATH", DEFAULT_PATH)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except ValueError as e:
+            print(f"[RewriteCache] ⚠️  Ignoring '{path}': not valid JSON ({e}).")
+            data = {}
+        if not isinstance(data, dict) or not isinstance(data.get("entries", {}), dict):
+            print(f"[RewriteCache] ⚠️  Ignoring '{path}': expected a JSON object with an 'entries' object.")
+            data = {}
+        if data and data.get("version") != FORMAT_VERSION:
+            print(f"[RewriteCache] ⚠️  Ignoring '{path}': expected format version {FORMAT_VERSION}.")
+            data = {}
+        _entries = data.get("entries", {})
+        if _entries:
+            print(f"[RewriteCache] Loaded {len(_entries)} precomputed rewrites.")
+    return _entries
+
+
+def lookup(text: str, context: str = None) -> dict | None:
+    """Returns {suggestions, polite_rewrite} for a cached comment, or None."""
+    if context and context.strip():
+        return None
+    entry = load().get(normalize(text))
+    if entry is None:
+        return None
+    return {"suggestions": list(entry["suggestions"]), "polite_rewrite": entry["polite_rewrite"]}
+
+
+def save(entries: dict, path: str = DEFAULT_PATH):
+    """Writes a table built by build_rewrite_cache.py."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": FORMAT_VERSION, "entries": entries}, f, ensure_ascii=False, separators=(",", ":"))